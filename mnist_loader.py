@@ -8,153 +8,500 @@ download these files if they do not already exist locally.
    - loadLabels reads the corresponding label data, one for each image.
    - mnist_load packs the downloaded image and label data into a combined 
      format to be read later by our neural network.
+   - build_mnist_npz saves all four data files, already decompressed, into
+     a single file that mnist_load will then read instead.
+
+Large files are decompressed with the 'rapidgzip' package (pip install
+rapidgzip) when it is installed, which uses all CPU cores at once. Failing
+that, and for small files, it uses the 'isal' package (pip install isal), which is several times
+faster than the standard gzip module. Without either, the standard gzip
+module is used.
 '''
 import urllib.request
-import gzip
+import zipfile
+import concurrent.futures
+import contextlib
+import functools
+import math
 import os
 import struct
+import tempfile
 import numpy as np
-import matplotlib.pyplot as plt
+try:
+    # isal's igzip is a drop-in replacement for gzip built on Intel's
+    # ISA-L library.
+    from isal import igzip as gzip
+except ImportError:
+    import gzip
+try:
+    # rapidgzip decompresses a single gzip file using several threads.
+    import rapidgzip
+except ImportError:
+    rapidgzip = None
+
+# This is where the data files are located
+URLROOT = 'http://yann.lecun.com/exdb/mnist/'
+
+# The size in bytes of each of the four MNIST data files. A download of any
+# other size is broken or incomplete.
+_EXPECTED_SIZES = {
+    'train-images-idx3-ubyte.gz': 9912422,
+    'train-labels-idx1-ubyte.gz': 28881,
+    't10k-images-idx3-ubyte.gz': 1648877,
+    't10k-labels-idx1-ubyte.gz': 4542,
+}
+
+# The header of each data file starts with a 4 byte "magic number" that
+# says what the file holds: 0x00000803 (2051) for images and 0x00000801
+# (2049) for labels. We compare these bytes directly.
+_IMG_MAGIC = b'\x00\x00\x08\x03'
+_LBL_MAGIC = b'\x00\x00\x08\x01'
+
+# After the magic number comes a run of big-endian ('>') unsigned 32-bit
+# integers ('I'). Image files have three: number of images, number of rows
+# and number of columns. Label files have one: the number of labels.
+# Building the Struct objects once here means the format strings are only
+# parsed a single time.
+_IMG_HDR = struct.Struct('>III')
+_LBL_HDR = struct.Struct('>I')
+
+# Every MNIST image is 28x28 pixels, stored as 784 bytes.
+_MNIST_IMAGE_DIMS = (28, 28)
+
+# The combined file written by build_mnist_npz, and the name each of the
+# four MNIST data files is stored under inside it.
+MNIST_NPZ = 'mnist.npz'
+_NPZ_KEYS = {
+    'train-images-idx3-ubyte.gz': 'train_x',
+    'train-labels-idx1-ubyte.gz': 'train_y',
+    't10k-images-idx3-ubyte.gz': 'test_x',
+    't10k-labels-idx1-ubyte.gz': 'test_y',
+}
+
+# Size of the read buffer on the compressed file. Before Python 3.12, gzip
+# reads the compressed data 8 KiB at a time; reading it from the disk in
+# 128 KiB pieces instead means far fewer trips to the operating system.
+_READ_BUFFER_SIZE = 1 << 17
+
+# rapidgzip is only worth its start-up cost for large files, such as the
+# image files; smaller files like the labels are read with gzip.
+_RAPIDGZIP_MIN_SIZE = 1 << 20
+
+# The 10 possible digit vectors (see vectorized_digit), built once. Digit j
+# is _ONEHOT[j]: a (10, 1) float32 column that is all zeros except for a 1.0
+# in row j. It is made read-only because the same vectors are handed out
+# every time.
+_ONEHOT = np.eye(10, dtype=np.float32)[:, :, None]
+_ONEHOT.setflags(write=False)
+
+def _ensure_downloaded(src):
+    '''
+    Check for the existence of the file 'src' and if it is not present,
+    download it from URLROOT. Returns the name of the local file.
+
+    The download goes to a temporary file first. If 'src' is one of the
+    MNIST data files, its size is checked before the file is renamed to
+    'src', so an interrupted download is never mistaken for the real thing.
+    Files that already exist are used as they are.
+    '''
+    if os.path.exists(src):
+        return src
+    expected = _EXPECTED_SIZES.get(os.path.basename(src))
+    fd, tmp = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(src) or '.')
+    os.close(fd)
+    try:
+        print ('Downloading ' + URLROOT + src)
+        urllib.request.urlretrieve(URLROOT+src, tmp)
+        print ('Done.')
+        if expected != None and os.path.getsize(tmp) != expected:
+            raise Exception('Download of {0} has the wrong size.'.format(src))
+        os.replace(tmp, src)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return src
 
-def loadImages(src, n_images=None):
+@contextlib.contextmanager
+def _open_gz(gzfname):
+    '''
+    Open the gzip'd (compressed) data file 'gzfname' for reading, for use
+    in a 'with' statement. rapidgzip is used for files of at least
+    _RAPIDGZIP_MIN_SIZE bytes if it is available, otherwise gzip reads from
+    the file through a _READ_BUFFER_SIZE buffer.
+    '''
+    if (rapidgzip is not None
+            and os.path.getsize(gzfname) >= _RAPIDGZIP_MIN_SIZE):
+        with rapidgzip.open(gzfname, parallelization=os.cpu_count()) as gz:
+            yield gz
+        return
+    with open(gzfname, 'rb', buffering=_READ_BUFFER_SIZE) as f, \
+         gzip.open(f) as gz:
+        yield gz
+
+def _read_array(gz, arr):
+    '''
+    Fill the NumPy array 'arr' with bytes read from the open file 'gz'.
+    readinto may hand back fewer bytes than asked for, so keep reading into
+    the rest of the array until it is full or the file runs out. Returns
+    the number of bytes read.
+    '''
+    # Flatten first: memoryview can't cast an empty 2-D array to bytes
+    mv = memoryview(arr.reshape(-1))
+    off = 0
+    while off < arr.nbytes:
+        n = gz.readinto(mv[off:])
+        if not n:
+            break
+        off += n
+    return off
+
+def _pinned_empty(shape):
+    '''
+    Create an uninitialized uint8 PyTorch tensor of the given shape in
+    pinned (page-locked) memory, which can be copied to the GPU much faster
+    than ordinary memory. Returns the tensor and a NumPy array that shares
+    its memory.
+    '''
+    # PyTorch takes a long time to import, so only do it when asked for
+    import torch
+    buf = torch.empty(shape, dtype=torch.uint8, pin_memory=True)
+    return buf, buf.numpy()
+
+def _cache_is_fresh(cache, *srcs):
+    '''
+    Return True if the cache file 'cache' exists and is at least as new as
+    each of the source files 'srcs' it was made from. A source that has been
+    replaced since (say, with Fashion-MNIST, which uses the same file names)
+    makes the cache stale. Sources that are missing locally don't count.
+    '''
+    if not os.path.exists(cache):
+        return False
+    made = os.path.getmtime(cache)
+    for src in srcs:
+        if os.path.exists(src) and os.path.getmtime(src) > made:
+            return False
+    return True
+
+def _save_cache(cache, arr):
+    '''
+    Save the decompressed array 'arr' to the .npy file 'cache'. The data is
+    written to a temporary file first and then renamed, so an interrupted
+    run never leaves a half-written cache behind, and two programs saving
+    the same file at once don't write over each other.
+
+    The cache is only there to save time, so if it can't be written (say,
+    the directory is read-only or the disk is full) we just carry on.
+    '''
+    try:
+        fd, tmp = tempfile.mkstemp(suffix='.tmp',
+                                   dir=os.path.dirname(cache) or '.')
+    except OSError as e:
+        print ('Unable to save ' + cache + ': ' + str(e))
+        return
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, arr)
+        os.replace(tmp, cache)
+    except OSError as e:
+        print ('Unable to save ' + cache + ': ' + str(e))
+    finally:
+        # Once renamed the temporary file is gone; otherwise tidy it up
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+def _load_idx(src, magic, header, item_dims, n_items=None, pin_memory=False):
+    '''
+    _load_idx does the work for both loadImages and loadLabels. The MNIST
+    image and label files share one layout: a 4 byte magic number, a run of
+    32-bit integers giving the number of entries (and, for images, their
+    rows and columns), then the entries themselves, one byte per value.
+
+    Inputs:
+            src: The name of a source file from which to read
+          magic: The 4 bytes the file must start with
+         header: The Struct used to read the integers after the magic number
+      item_dims: The sizes the header must give for each entry after the
+                 number of entries, e.g. (28, 28) for MNIST images and ()
+                 for labels.
+        n_items: (optional) A count of how many entries to load. If not
+                 present, then all entries are loaded.
+     pin_memory: (optional) If True, return a PyTorch tensor in pinned
+                 memory instead of a NumPy array.
+
+    Returns an array with one row per entry, each row holding the product
+    of item_dims bytes.
+    '''
+    item_size = math.prod(item_dims)
+    # If we have already decompressed this file, and it hasn't changed since,
+    # memory-map the saved copy. A saved copy of the wrong shape didn't come
+    # from this kind of file, so ignore it; reading 'src' below will then
+    # report what is really wrong.
+    cache = src + '.npy'
+    if _cache_is_fresh(cache, src):
+        res = np.load(cache, mmap_mode='r')
+    else:
+        res = None
+    if res is not None and res.ndim == 2 and res.shape[1] == item_size:
+        if n_items == None:
+            n_items = len(res)
+        elif n_items > len(res):
+            raise Exception('Unable to read {0} entries from {1}.'.format(n_items, src))
+        if pin_memory:
+            buf, arr = _pinned_empty((n_items, item_size))
+            arr[...] = res[:n_items]
+            return buf
+        return res[:n_items]
+    # First check to see if the file exists and if not, download it.
+    gzfname = _ensure_downloaded(src)
+    # Now that we have the source file, read it and throw exceptions (error
+    # flags) if something bad happens.
+    # Open a gzip'd (compressed) data file
+    with _open_gz(gzfname) as gz:
+        # Read the whole header in one go
+        hdr = gz.read(len(magic) + header.size)
+        # Check the magic number to make sure the file holds the kind of
+        # data we expect
+        if hdr[:len(magic)] != magic:
+            raise Exception('Invalid file: unexpected magic number.')
+        n, *dims = header.unpack_from(hdr, len(magic))
+        # Check that we haven't been asked to read in more than n entries
+        if n_items == None:
+            n_items = n    # Set the number of entries to read to the number
+                           # present
+        elif n_items > n:
+            raise Exception('Unable to read {0} entries from {1}.'.format(n_items, src))
+        if tuple(dims) != item_dims:
+            raise Exception('Invalid file: expected entries of size {0}'.format(item_dims))
+        # The remainder of the data file is one continuous stream of binary
+        # data, where every item_size bytes is one separate entry. We will
+        # read all of it straight into one array of bytes, one row per entry.
+        # Pinned memory is scarce, so only read straight into a pinned
+        # tensor when every entry was asked for.
+        if pin_memory and n_items == n:
+            buf, res = _pinned_empty((n, item_size))
+        else:
+            res = np.empty((n, item_size), dtype = np.uint8)
+        if _read_array(gz, res) != res.nbytes:
+            raise Exception('Invalid file: data ended early.')
+    # Save every entry for next time
+    _save_cache(cache, res)
+    # Return the entries we were asked for
+    if pin_memory:
+        if n_items < n:
+            buf, arr = _pinned_empty((n_items, item_size))
+            arr[...] = res[:n_items]
+        return buf
+    return res[:n_items]
+
+@functools.lru_cache(maxsize=4)
+def _load_idx_all(src, magic, header, item_dims, mtime):
+    '''
+    _load_idx for every entry in 'src', remembering the arrays it returns
+    so that asking for the same file again in the same program costs
+    nothing. 'mtime' is the modification time of 'src'; it is only there so
+    that a file that has changed is read again. The arrays are shared by
+    every caller, so they are made read-only.
+    '''
+    res = _load_idx(src, magic, header, item_dims)
+    res.setflags(write=False)
+    return res
+
+def _load_idx_cached(src, magic, header, item_dims, n_items):
+    '''
+    The first n_items entries of the array from _load_idx_all. Only whole
+    files are remembered, so asking for a few entries doesn't keep a
+    second copy of the file alive.
+    '''
+    mtime = os.path.getmtime(src) if os.path.exists(src) else None
+    res = _load_idx_all(src, magic, header, item_dims, mtime)
+    if n_items == None:
+        return res
+    if n_items > len(res):
+        raise Exception('Unable to read {0} entries from {1}.'.format(n_items, src))
+    return res[:n_items]
+
+def loadImages(src, n_images=None, pin_memory=False):
     '''
     loadImages reads image data from the MNIST image data files.
 
     It checks for the existence of a 'src' file and if it is not present,
     it downloads it. 
 
-    Next, it opens the file and reads in the first 4 bytes of the data. 
-    That data is actually a 32-bit (4 byte) integer and is known as a
+    Next, it opens the file and reads in the 16 byte header. The first
+    4 bytes are a 32-bit integer known as a
     "magic number" (See description at the URL given above.) The magic 
     number tells us whether the file contains image data or label data. 
     If it detects anything but an image file, it prints an error
     message and quits. (We will load label data in another function.)
 
-    It then reads the next 4 bytes, another 32-bit integer that tells us 
+    The next 4 bytes are another 32-bit integer that tells us 
     the toal number of images stored in the file. It will load all of the images
     if n_images was not passed in, otherwise it will only read in n_images,
-    after first checking that n_images <= total images.
+    after first checking that n_images <= total images. The last 8 bytes
+    give the number of rows and columns in each image, which must be 28x28.
+
+    The first time a file is read, all of its images are saved, already
+    decompressed, to a NumPy file named src + '.npy'. Later calls load that
+    file directly and skip the download and decompression steps, unless
+    'src' has been changed since the .npy file was written. That file
+    is memory-mapped rather than read into memory, so only the images that
+    are actually used get read from disk.
+
+    Within one run of a program, calling loadImages again for the same
+    file returns the same data without reading anything. The NumPy array
+    returned is read-only; use .copy() if you need to change it. None of
+    this applies with pin_memory=True: every such call reads the data
+    afresh into its own tensor, which can be changed.
 
     Inputs:
             src: The name of a source file from which to read
        n_images: (optional) A count of how many images to load. If not
                  present, then all images are loaded.
+     pin_memory: (optional) If True, return the images as a PyTorch uint8
+                 tensor in pinned memory instead of a NumPy array, ready to
+                 be sent to the GPU with .to('cuda', non_blocking=True).
+                 Needs PyTorch and a CUDA-capable machine.
                            
     '''
-    # This is where the data files are located
-    URLROOT = 'http://yann.lecun.com/exdb/mnist/'
-    # First check to see if the file exists and if not, download it. The line
-    # below creates a boolean value based on the existence of the file.
-    # 'True' means the file exists, 'False' means it not.
-    SRCExists = os.path.exists(src) 
-    if not SRCExists:
-       print ('Downloading ' + URLROOT + src)
-       gzfname, h = urllib.request.urlretrieve(URLROOT+src, src)
-       print ('Done.')
-    else:
-       gzfname = src
-    # Now that we have the source file, try reading it and throw 
-    # exceptions (error flags) if something bad happens.
-    try:
-        # Open a gzip'd (compressed) data file
-        with gzip.open(gzfname) as gz:
-            # Read in the first 4 bytes of the file
-            n = struct.unpack('I', gz.read(4))
-            # Read magic number. The binary data was stored as 
-            # most-significant-bytes first. Modern PCs read in data in 
-            # least-significant-bytes first. So if the magic number (in hex
-            # format) is 0x00000803 (2051 in decimal) then our Python code
-            # will actually read in the last 4-bytes first, and then the first 
-            # 4 bytes. That is, Python will load this value as 0x0803 followed
-            # by 0x0000. So this is how we check for the correct magic number
-            # value.
-            if n[0] != 0x03080000:
-                raise Exception('Invalid file: unexpected magic number.')
-            # Read number of entries from the next 4 bytes (32-bits)
-            n = struct.unpack('>I', gz.read(4))[0]
-            # Check that we haven't been asked to read in more than n images
-            if n_images == None:
-                n_images = n   # Set the number of images to read to the number
-                               # present
-            elif n_images > n:
-                raise Exception('Unable to read {0} entries from data file.'.format(n_images))
-            # Now start loading images. The next 8 bytes (4 bytes at a time) tell
-            # us the number of rows and the number of columns for each image
-            n_rows = struct.unpack('>I', gz.read(4))[0]
-            n_cols = struct.unpack('>I', gz.read(4))[0]
-            # Make sure we are working with the data containing 28x28 pixels
-            if n_rows != 28 or n_cols != 28:
-                raise Exception('Invalid file: expected 28 rows & cols per img')
-            # The remainder of the data file is one continuous stream of binary
-            # data, where every 28x28=784 bytes is one separate image. We will
-            # read this data into one single array of bytes
-            res = np.frombuffer(gz.read(n_images * n_rows * n_cols), dtype = np.uint8)
-    finally:
-        # Reshape 'res' into an array of images. There will be 'n_images' images
-        # each of size n_rows * n_cols
-        return res.reshape((n_images, n_rows * n_cols))
+    # Make sure we are working with the data containing 28x28 pixels
+    if pin_memory:
+        # Each call gets its own pinned tensor
+        return _load_idx(src, _IMG_MAGIC, _IMG_HDR, _MNIST_IMAGE_DIMS,
+                         n_images, pin_memory)
+    return _load_idx_cached(src, _IMG_MAGIC, _IMG_HDR, _MNIST_IMAGE_DIMS,
+                            n_images)
  
 def loadLabels(src, n_images=None):
     '''
-    loadLabels is very much like loadImages.
+    loadLabels is very much like loadImages. The label file's header is
+    only 8 bytes: the magic number and the number of labels. The rest of
+    the file is just a stream of integers that label the corresponding
+    images from the image file, one byte each.
     '''
-    URLROOT = 'http://yann.lecun.com/exdb/mnist/'
-    SRCExists = os.path.exists(src) 
-    if not SRCExists:
-        print ('Downloading ' + URLROOT + src)
-        gzfname, h = urllib.request.urlretrieve(URLROOT+src, src)
-        print ('Done.')
-    else:
-        gzfname = src
+    return _load_idx_cached(src, _LBL_MAGIC, _LBL_HDR, (), n_images)
+
+@functools.lru_cache(maxsize=4)
+def _npz_memmap(npz_file, key, mtime):
+    '''
+    Memory-map the array 'key' stored in the .npz file 'npz_file'. 'mtime'
+    is the file's modification time; it is only there so that a file that
+    has been rewritten since is mapped afresh rather than served from the
+    cache. np.load
+    can't memory-map arrays inside an .npz, but build_mnist_npz stores them
+    uncompressed, so each one is an ordinary .npy file sitting at some
+    offset inside the archive, and we can map it directly. The array is
+    read-only.
+    '''
+    with zipfile.ZipFile(npz_file) as zf:
+        info = zf.getinfo(key + '.npy')
+    if info.compress_type != zipfile.ZIP_STORED:
+        raise Exception('Invalid file: {0} is compressed.'.format(npz_file))
+    with open(npz_file, 'rb') as f:
+        # Skip the zip entry's local header: 30 bytes, then the file name
+        # and an "extra" field whose lengths are stored at bytes 26-29
+        f.seek(info.header_offset)
+        name_len, extra_len = struct.unpack('<HH', f.read(30)[26:30])
+        f.seek(info.header_offset + 30 + name_len + extra_len)
+        # Now read the .npy header to find the array's shape and type
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+        offset = f.tell()
+    return np.memmap(npz_file, dtype=dtype, mode='r', offset=offset,
+                     shape=shape, order='F' if fortran else 'C')
+
+def build_mnist_npz(npz_file=MNIST_NPZ):
+    '''
+    Load all four MNIST data files (downloading them if needed) and save
+    them together, already decompressed, in the NumPy file 'npz_file'.
+    Once that file exists, mnist_load reads from it instead of the gzip'd
+    files (pass the same npz_file to mnist_load if it isn't MNIST_NPZ).
+    '''
+    arrays = {}
+    for src, key in _NPZ_KEYS.items():
+        if key.endswith('_x'):
+            arrays[key] = loadImages(src)
+        else:
+            arrays[key] = loadLabels(src)
+    # Write to a temporary file and rename it, so that an interrupted build
+    # never leaves a half-written file for mnist_load to pick up
+    fd, tmp = tempfile.mkstemp(suffix='.tmp',
+                               dir=os.path.dirname(npz_file) or '.')
     try:
-        with gzip.open(gzfname) as gz:
-            n = struct.unpack('I', gz.read(4))
-            # Read magic number. Check that we have a "label" file
-            if n[0] != 0x01080000:
-                raise Exception('Invalid file: unexpected magic number.')
-            # Read number of entries.
-            n = struct.unpack('>I', gz.read(4))
-            # Check that we haven't been asked to read in more than n images
-            if n_images == None:
-                n_images = n[0]    # Set the number of images to read to the
-                                   # number present
-            elif n_images > n[0]:
-                raise Exception('Unable to read {0} entires from label file.'.format(n_images))
-            # Read labels. The remaining file is just a stream of integers that
-            # label the corresponding images from the image file.
-            res = np.frombuffer(gz.read(n_images), dtype = np.uint8)
-    finally: 
-        # Return an array of these integers
-        return res.reshape((n_images, 1))
-
-def mnist_load(imageSrc, labelsSrc, n_images):
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, npz_file)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    # Forget any arrays mapped from an older copy of the file
+    _npz_memmap.cache_clear()
+
+def mnist_load(imageSrc, labelsSrc, n_images, npz_file=MNIST_NPZ):
     '''
+    If build_mnist_npz has written 'npz_file' and imageSrc and labelsSrc
+    are the standard MNIST file names, the data is memory-mapped from
+    npz_file instead, unless either source file has changed since.
+
     Inputs:
        imageSrc: The name of a source file containing image data
        labelSrc: The name of a file containing image labels
-           n_images: How many image samples to read
-    '''
-    images = loadImages(imageSrc, n_images)
-    labels = loadLabels(labelsSrc, n_images)
-    vectorized_labels = []
-    for label in labels:
-        vd = vectorized_digit(label)
-        vectorized_labels.append(vd)
+           n_images: How many image samples to read. If None, all of them
+                     are read.
+       npz_file: (optional) The combined file written by build_mnist_npz
+    '''
+    image_key = _NPZ_KEYS.get(imageSrc)
+    label_key = _NPZ_KEYS.get(labelsSrc)
+    if (image_key and label_key
+            and _cache_is_fresh(npz_file, imageSrc, labelsSrc)):
+        # Everything is already decompressed in the combined file
+        mtime = os.path.getmtime(npz_file)
+        images = _npz_memmap(npz_file, image_key, mtime)
+        labels = _npz_memmap(npz_file, label_key, mtime)
+        if len(images) != len(labels):
+            raise Exception('Invalid file: {0} has {1} images but {2} labels.'.format(npz_file, len(images), len(labels)))
+        if n_images == None:
+            n_images = len(images)
+        elif n_images > len(images):
+            raise Exception('Unable to read {0} entries from {1}.'.format(n_images, npz_file))
+        images = images[:n_images]
+        labels = labels[:n_images]
+    else:
+        # Load the images and the labels at the same time. Downloading and
+        # decompressing both spend most of their time outside of Python, so
+        # two threads really do run side by side.
+        with concurrent.futures.ThreadPoolExecutor(2) as pool:
+            images = pool.submit(loadImages, imageSrc, n_images)
+            labels = pool.submit(loadLabels, labelsSrc, n_images)
+            images = images.result()
+            labels = labels.result()
+    # Turn every label into a 10-element vector (see vectorized_digit) all at
+    # once: start with all zeros, then set element 'label' of each to 1.0
+    labels_flat = labels.ravel().astype(np.intp)
+    vectorized_labels = np.zeros((labels_flat.size, 10, 1), dtype=np.float32)
+    vectorized_labels[np.arange(labels_flat.size), labels_flat, 0] = 1.0
     return images, vectorized_labels
 
 def vectorized_digit(j):
     '''
     Given a digit 'j', return a 10-element vector representing that digit.
     The vector is all zeros excpet for the jth element, which is 1.
+
+    The vector returned is shared between calls and is read-only. Use
+    vectorized_digit(j).copy() if you need to change it.
     '''
-    # Create a 10-element array of zeros.
-    e = np.zeros((10, 1))
-    # Set the jth element to 1.0
-    e[j] = 1.0
-    return e
+    # Row j of the identity matrix is exactly the vector we want.
+    # np.asarray(j).item() accepts a plain int as well as a 1-element array
+    # such as a row of the labels returned by loadLabels.
+    return _ONEHOT[np.asarray(j).item()]
 
 # Code to test out the library
 if __name__ == "__main__":
+    # matplotlib is only needed to show the sample images, and is slow to
+    # import, so it is not imported by programs that just load the data
+    import matplotlib.pyplot as plt
 
     # Training image and label data
     training_image_file = 'train-images-idx3-ubyte.gz'